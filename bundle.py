@@ -0,0 +1,147 @@
+import os
+import json
+import mmap
+import struct
+
+# Layout: MAGIC | uint32 version | uint64 header offset | uint32 header length | padding |
+# 8-byte aligned page blobs | JSON header. Blobs are streamed as pages are produced and the
+# header, which holds absolute blob offsets, is appended last and patched into the prefix.
+BUNDLE_EXT = ".bundle"
+MAGIC = b"PMB1"
+VERSION = 1
+PREFIX = struct.Struct("<4sIQI")
+ALIGN = 8
+
+class BundleError(ValueError):
+    pass
+
+def bundle_path_for(images_dir, manual):
+    return os.path.join(images_dir, manual + BUNDLE_EXT)
+
+def _pad(size):
+    return (-size) % ALIGN
+
+class BundleWriter:
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.entries = []
+        self.f = open(self.tmp_path, "wb")
+        self._write(PREFIX.pack(MAGIC, VERSION, 0, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _write(self, data):
+        self.f.write(data)
+        self.f.write(b"\0" * _pad(len(data)))
+
+    def add(self, name, image_bytes, text):
+        entry = {"name": name}
+        for key, blob in (("image", image_bytes or b""), ("text", (text or "").encode("utf-8"))):
+            entry[key] = [self.f.tell(), len(blob)]
+            self._write(blob)
+        self.entries.append(entry)
+
+    def close(self):
+        header = json.dumps({"version": VERSION, "entries": self.entries}).encode("utf-8")
+        header_offset = self.f.tell()
+        self.f.write(header)
+        self.f.seek(0)
+        self.f.write(PREFIX.pack(MAGIC, VERSION, header_offset, len(header)))
+        self.f.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.f.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+def write_bundle(path, pages):
+    # pages: [(name, png_bytes, text), ...] in manual order
+    with BundleWriter(path) as writer:
+        for name, image_bytes, text in pages:
+            writer.add(name, image_bytes, text)
+
+class ManualBundle:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < PREFIX.size:
+                raise BundleError(f"Bundle is truncated ({size} bytes): {path}")
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mm)
+
+        try:
+            entries = self._read_header()
+        except Exception:
+            self.close()
+            raise
+        self.entries = {e["name"]: e for e in entries}
+        self.names = [e["name"] for e in entries]
+
+    def _read_header(self):
+        size = len(self.mm)
+        magic, version, header_offset, header_len = PREFIX.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise BundleError(f"Not a manual bundle: {self.path}")
+        if version != VERSION:
+            raise BundleError(f"Unsupported bundle version {version}: {self.path}")
+        if header_offset < PREFIX.size or header_offset + header_len > size:
+            raise BundleError(f"Bundle header is out of range: {self.path}")
+
+        try:
+            header = json.loads(bytes(self.view[header_offset:header_offset + header_len]).decode("utf-8"))
+        except ValueError as e:
+            raise BundleError(f"Bundle header is damaged: {self.path} ({e})")
+
+        if not isinstance(header, dict) or header.get("version") != VERSION:
+            raise BundleError(f"Bundle header is damaged: {self.path}")
+        entries = header.get("entries")
+        if not isinstance(entries, list):
+            raise BundleError(f"Bundle header is damaged: {self.path}")
+        for entry in entries:
+            # Every blob must lie between the prefix and the header
+            if not (isinstance(entry, dict) and isinstance(entry.get("name"), str)):
+                raise BundleError(f"Bundle entry is damaged: {self.path}")
+            for key in ("image", "text"):
+                span = entry.get(key)
+                if not (isinstance(span, list) and len(span) == 2 and all(isinstance(n, int) for n in span)):
+                    raise BundleError(f"Bundle entry '{entry['name']}' is damaged: {self.path}")
+                offset, length = span
+                if offset < PREFIX.size or length < 0 or offset + length > header_offset:
+                    raise BundleError(f"Bundle entry '{entry['name']}' runs past the data: {self.path}")
+        return entries
+
+    def close(self):
+        if self.mm is None:
+            return
+        self.view.release()
+        try:
+            self.mm.close()
+        except BufferError:
+            # An image slice is still referenced; the mapping is freed once it is dropped
+            pass
+        self.mm = None
+
+    def _slice(self, name, key):
+        entry = self.entries.get(name)
+        if entry is None:
+            return None
+        offset, length = entry[key]
+        return self.view[offset:offset + length]
+
+    def image(self, name):
+        # Zero-copy slice of the mapped file
+        return self._slice(name, "image")
+
+    def text(self, name):
+        data = self._slice(name, "text")
+        return bytes(data).decode("utf-8") if data is not None else ""
@@ -1,5 +1,4 @@
 import os
-import difflib
 from datetime import datetime
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QMessageBox, QHBoxLayout, QVBoxLayout,
@@ -11,8 +10,10 @@ from PyQt5.QtCore import Qt, QTimer
 from ui.chatbot import Ui_Form
 from src.manual_generator import run_manual_import, PDF_RES
 from src.loader import LoadingDialog
+from src.search_index import ShardedHelpIndex
 
-HELP_ENTRIES = []
+ALL_MANUALS = "All Manuals"
+ALL_MANUALS_GUIDELINE = "Searching all imported manuals. Select a manual to see its guideline."
 
 class ChatBotWindow(QWidget):
     def __init__(self):
@@ -30,6 +31,7 @@ class ChatBotWindow(QWidget):
         self.step_results = []
         self.step_index = 0
         self.last_query = None
+        self.help_index = ShardedHelpIndex(os.path.join("res", "images"))
 
         self.ui.send.clicked.connect(self.handle_query)
         self.ui.lineEdit.returnPressed.connect(self.handle_query)
@@ -54,7 +56,9 @@ class ChatBotWindow(QWidget):
 
     def load_guidelines(self):
         if not self.selected_pdf_folder:
-            print("❗ No PDF folder selected.")
+            # No manual selected means every manual is searched; don't leave a stale guideline up
+            if hasattr(self.ui, 'guidelineLabel'):
+                self.ui.guidelineLabel.setText(ALL_MANUALS_GUIDELINE)
             return
 
         # Normalize name to match the guideline filename generated earlier
@@ -74,45 +78,56 @@ class ChatBotWindow(QWidget):
 
     def load_pdf_files(self):
         self.ui.pdfList.clear()
+        self.ui.pdfList.addItem(ALL_MANUALS)
         for file in os.listdir(PDF_RES):
             if file.lower().endswith(".pdf"):
                 self.ui.pdfList.addItem(file)
 
     def select_pdf(self, item):
-        self.selected_pdf_folder = os.path.splitext(item.text())[0]
-        self.add_message(f" Selected PDF: {item.text()}", is_user=False)
+        # Selecting a manual only filters search results; shards stay cached in the index
+        self.last_query = None
+        if item.text() == ALL_MANUALS:
+            self.selected_pdf_folder = None
+            self.add_message(" Searching all manuals.", is_user=False)
+        else:
+            self.selected_pdf_folder = os.path.splitext(item.text())[0]
+            self.add_message(f" Selected PDF: {item.text()}", is_user=False)
         self.load_help_entries()
         self.load_guidelines()  # <-- ADDED here
 
     def load_help_entries(self):
-        global HELP_ENTRIES
-        HELP_ENTRIES = []
         self.ui.chatHistory.clear()
         self.chat_history.clear()
 
         if not self.selected_pdf_folder:
+            # Topics of every manual, grouped under a header per manual
+            for manual in self.help_index.manuals():
+                shard = self.help_index.get_shard(manual)
+                if shard is None:
+                    continue
+                header = QListWidgetItem(manual)
+                header.setFlags(Qt.NoItemFlags)
+                self.ui.chatHistory.addItem(header)
+                self.add_topic_items(shard)
             return
 
-        folder = os.path.join("res", "images", self.selected_pdf_folder)
-        if not os.path.exists(folder):
+        shard = None
+        if self.help_index.has_manual(self.selected_pdf_folder):
+            shard = self.help_index.get_shard(self.selected_pdf_folder)
+        if shard is None:
             QMessageBox.critical(self, "Missing Folder", f"No extracted images found for '{self.selected_pdf_folder}'.")
             return
 
-        for filename in os.listdir(folder):
-            if filename.endswith(".png"):
-                title = filename[:-4].replace("_", " ").upper()
-                text_path = os.path.join(folder, filename.replace(".png", ".txt"))
-                content = ""
-                if os.path.exists(text_path):
-                    with open(text_path, "r", encoding="utf-8") as f:
-                        content = f.read().strip()
-                HELP_ENTRIES.append((title, content, os.path.join("images", self.selected_pdf_folder, filename)))
-                norm_title = title.lower()
-                if norm_title not in self.chat_history:
-                    self.chat_history.add(norm_title)
-                    item = QListWidgetItem(title.title())
-                    item.setTextAlignment(Qt.AlignLeft)
-                    self.ui.chatHistory.addItem(item)
+        self.add_topic_items(shard)
+
+    def add_topic_items(self, shard):
+        for title in shard.titles():
+            norm_title = title.lower()
+            if norm_title not in self.chat_history:
+                self.chat_history.add(norm_title)
+                item = QListWidgetItem(title.title())
+                item.setTextAlignment(Qt.AlignLeft)
+                self.ui.chatHistory.addItem(item)
 
     def handle_query(self):
         query = self.ui.lineEdit.text().strip()
@@ -153,12 +168,13 @@ class ChatBotWindow(QWidget):
 
         # Handle "continue" command
         if query_clean == "continue" and self.step_index < len(self.step_results):
-            title, desc, image_path = self.step_results[self.step_index]
+            manual, title, desc, image_path = self.step_results[self.step_index]
             self.step_index += 1
+            self.add_message(f" From manual: <b>{manual}</b>", is_user=False)
             if desc:
                 self.add_message(self.format_html(desc), is_user=False)
             if image_path:
-                self.display_image(image_path)
+                self.display_image(image_path, manual)
             if self.step_index < len(self.step_results):
                 self.add_message(
                     f"Step {self.step_index} completed. Type <b>continue</b> to proceed or ask another topic.",
@@ -173,31 +189,19 @@ class ChatBotWindow(QWidget):
             return
         self.last_query = query_clean
 
-        def normalize(text):
-            return text.lower().replace("_", " ").replace("-", " ").strip()
-
-        self.step_results = []
+        # Ranked across every imported manual, or only the selected one
+        self.step_results = self.help_index.search(query_clean, self.selected_pdf_folder)
         self.step_index = 0
-        best_match = None
-        best_score = 0
-
-        for title, desc, image in HELP_ENTRIES:
-            norm_title = normalize(title)
-            score = difflib.SequenceMatcher(None, query_clean, norm_title).ratio()
-            if query_clean in norm_title or score > 0.6:
-                self.step_results.append((title, desc, image))
-                if score > best_score:
-                    best_match = (title, desc, image)
-                    best_score = score
-
-        if self.step_results and best_match:
-            title, desc, image_path = best_match
+
+        if self.step_results:
+            manual, title, desc, image_path = self.step_results[0]
             self.step_index = 1  # Showing step 1
             self.add_message(f" Found {len(self.step_results)} steps for this topic. Showing step 1...", is_user=False)
+            self.add_message(f" From manual: <b>{manual}</b>", is_user=False)
             if desc:
                 self.add_message(self.format_html(desc), is_user=False)
             if image_path:
-                self.display_image(image_path)
+                self.display_image(image_path, manual)
 
             if self.step_index < len(self.step_results):
                 self.add_message(" Step 1 completed. Type <b>continue</b> to see the next step.", is_user=False)
@@ -277,11 +281,22 @@ class ChatBotWindow(QWidget):
                 html += f"{line}<br><br>"
         return html
 
-    def display_image(self, image_path):
-        full_path = os.path.join("res", image_path)
-        if os.path.exists(full_path):
+    def display_image(self, image_path, manual=None):
+        pixmap = None
+        data = self.help_index.image_data(manual, image_path) if manual else None
+        if data is not None:
+            # Decode straight from the memory-mapped bundle slice
+            pixmap = QPixmap()
+            if not pixmap.loadFromData(data, "PNG"):
+                pixmap = None
+        else:
+            full_path = os.path.join("res", image_path)
+            if os.path.exists(full_path):
+                pixmap = QPixmap(full_path)
+
+        if pixmap is not None:
             img = QLabel()
-            pixmap = QPixmap(full_path).scaledToWidth(600, Qt.SmoothTransformation)
+            pixmap = pixmap.scaledToWidth(600, Qt.SmoothTransformation)
             img.setPixmap(pixmap)
             img.setStyleSheet("border-radius: 6px; margin: 10px;")
 
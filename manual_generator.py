@@ -1,5 +1,6 @@
 import os
 import re
+import io
 import numpy as np
 import cv2
 from pdf2image import convert_from_path
@@ -7,6 +8,8 @@ from PyPDF2 import PdfReader
 from PIL import Image, ImageOps
 import pytesseract
 
+from src.bundle import BundleWriter, bundle_path_for
+
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 POPPLER_PATH = os.path.join(BASE_DIR, "res", "poppler", "Library", "bin")
 TESSERACT_PATH = os.path.join(BASE_DIR, "res", "Tesseract-OCR")
@@ -14,6 +17,7 @@ TESSERACT_PATH = os.path.join(BASE_DIR, "res", "Tesseract-OCR")
 PDF_RES = os.path.join(BASE_DIR, "res")
 OUTPUT_DIR = os.path.join(PDF_RES, "images")
 TOC_SCAN_PAGES = 8
+PACK_BUNDLES = True  # Write one packed .bundle per manual instead of loose .png/.txt files
 
 def clean_filename(name):
     name = re.sub(r"[^\w\s-]", "", name).strip().lower().replace(" ", "_")
@@ -93,8 +97,9 @@ def extract_helpful_summary(text):
             return f"This section explains: {line}"
     return "This section contains important POS instructions."
 
-def generate_images_from_toc(pdf_path, output_dir, collected_titles):
-    os.makedirs(output_dir, exist_ok=True)
+def generate_images_from_toc(pdf_path, output_dir, collected_titles, bundle_path=None):
+    if not bundle_path:
+        os.makedirs(output_dir, exist_ok=True)
     print(f"\n Rendering from TOC: {pdf_path}")
 
     toc = extract_toc_from_pdf(pdf_path)
@@ -110,45 +115,87 @@ def generate_images_from_toc(pdf_path, output_dir, collected_titles):
         return
 
     used_filenames = set()
+    writer = None
+    bundle_count = 0
+    if bundle_path:
+        try:
+            writer = BundleWriter(bundle_path)
+        except Exception as e:
+            print(f"❌ Failed to create bundle {bundle_path}: {e}")
+            return
 
-    for i in range(len(toc)):
-        title, start_page = toc[i]
-        end_page = toc[i + 1][1] - 1 if i + 1 < len(toc) else len(pages)
-        base_filename = clean_filename(title)
-
-        collected_titles.append(title)
-
-        for j, page_num in enumerate(range(start_page, end_page + 1)):
-            index = page_num - 1
-            if index < 0 or index >= len(pages):
-                continue
-
-            image = crop_image(pages[index])
-            filename = f"{base_filename}({j + 1})"
-            while filename in used_filenames:
-                filename += "_alt"
-            used_filenames.add(filename)
-
-            image_path = os.path.join(output_dir, f"{filename}.png")
-            text_path = os.path.join(output_dir, f"{filename}.txt")
-
-            try:
-                image.save(image_path)
-                print(f" Saved image: {image_path}")
-            except Exception as e:
-                print(f"❌ Failed to save image {image_path}: {e}")
-
+    finished = False
+    try:
+        for i in range(len(toc)):
+            title, start_page = toc[i]
+            end_page = toc[i + 1][1] - 1 if i + 1 < len(toc) else len(pages)
+            base_filename = clean_filename(title)
+
+            collected_titles.append(title)
+
+            for j, page_num in enumerate(range(start_page, end_page + 1)):
+                index = page_num - 1
+                if index < 0 or index >= len(pages):
+                    continue
+
+                image = crop_image(pages[index])
+                filename = f"{base_filename}({j + 1})"
+                while filename in used_filenames:
+                    filename += "_alt"
+                used_filenames.add(filename)
+
+                image_bytes = b""
+                if writer:
+                    buf = io.BytesIO()
+                    try:
+                        image.save(buf, format="PNG")
+                        image_bytes = buf.getvalue()
+                    except Exception as e:
+                        print(f"❌ Failed to encode image {filename}: {e}")
+                else:
+                    image_path = os.path.join(output_dir, f"{filename}.png")
+                    try:
+                        image.save(image_path)
+                        print(f" Saved image: {image_path}")
+                    except Exception as e:
+                        print(f"❌ Failed to save image {image_path}: {e}")
+
+                content = ""
+                try:
+                    text = reader.pages[index].extract_text()
+                    if not text:
+                        text = pytesseract.image_to_string(ImageOps.autocontrast(ImageOps.grayscale(pages[index])))
+
+                    summary = extract_helpful_summary(text)
+                    content = f"[GUIDELINE] {summary}\n\n{title}\n\n{text.strip()}" if text else f"[GUIDELINE] {summary}\n\n{title}"
+                    if not writer:
+                        text_path = os.path.join(output_dir, f"{filename}.txt")
+                        with open(text_path, "w", encoding="utf-8") as f:
+                            f.write(content)
+                        print(f" Saved text: {text_path}")
+                except Exception as e:
+                    print(f" Failed to extract/save text for page {page_num}: {e}")
+
+                if writer:
+                    # Streamed straight to disk so encoded pages are not held until the end
+                    try:
+                        writer.add(filename, image_bytes, content)
+                        bundle_count += 1
+                    except Exception as e:
+                        print(f"❌ Failed to write bundle {bundle_path}: {e}")
+                        return
+
+        if writer and bundle_count:
             try:
-                text = reader.pages[index].extract_text()
-                if not text:
-                    text = pytesseract.image_to_string(ImageOps.autocontrast(ImageOps.grayscale(pages[index])))
-
-                summary = extract_helpful_summary(text)
-                with open(text_path, "w", encoding="utf-8") as f:
-                    f.write(f"[GUIDELINE] {summary}\n\n{title}\n\n{text.strip()}" if text else f"[GUIDELINE] {summary}\n\n{title}")
-                print(f" Saved text: {text_path}")
+                writer.close()
+                finished = True
+                print(f" Saved bundle: {bundle_path} ({bundle_count} pages)")
             except Exception as e:
-                print(f" Failed to extract/save text for page {page_num}: {e}")
+                print(f"❌ Failed to write bundle {bundle_path}: {e}")
+    finally:
+        # Any other exit (no pages, a failed page, an exception) drops the partial temp file
+        if writer and not finished:
+            writer.abort()
 
 def run_manual_import():
     pdfs = sorted(f for f in os.listdir(PDF_RES) if f.lower().endswith(".pdf"))
@@ -164,15 +211,18 @@ def run_manual_import():
         pdf_path = os.path.join(PDF_RES, pdf)
         pdf_name = os.path.splitext(pdf)[0]
         output_dir = os.path.join(OUTPUT_DIR, pdf_name)
+        bundle_path = bundle_path_for(OUTPUT_DIR, pdf_name)
 
-        if os.path.exists(output_dir) and len(os.listdir(output_dir)) > 0:
+        if os.path.exists(bundle_path) or (os.path.exists(output_dir) and len(os.listdir(output_dir)) > 0):
             print(f" Skipping already processed: {pdf}")
             skipped.append(pdf)
             continue
 
         print(f" Processing PDF: {pdf}")
         all_titles_by_pdf[pdf_name] = []
-        generate_images_from_toc(pdf_path, output_dir, all_titles_by_pdf[pdf_name])
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        generate_images_from_toc(pdf_path, output_dir, all_titles_by_pdf[pdf_name],
+                                 bundle_path if PACK_BUNDLES else None)
         processed.append(pdf)
 
     if all_titles_by_pdf:
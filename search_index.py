@@ -0,0 +1,218 @@
+import os
+import re
+import difflib
+from collections import OrderedDict
+
+from src.bundle import BUNDLE_EXT, ManualBundle, bundle_path_for
+
+SHARD_BUDGET_BYTES = 8 * 1024 * 1024  # Max UTF-8 size of page text kept in memory across manuals
+MATCH_THRESHOLD = 0.6
+PAGE_SUFFIX = re.compile(r"^(.*?)\((\d+)\)((?:_alt)*)$")  # clean_filename title + "(n)" + "_alt"...
+
+def normalize(text):
+    return text.lower().replace("_", " ").replace("-", " ").strip()
+
+def split_page_name(name):
+    match = PAGE_SUFFIX.match(name)
+    if not match:
+        return name, 0, ""
+    return match.group(1), int(match.group(2)), match.group(3)
+
+def page_sort_key(filename, mtime=0):
+    # The importer only adds "_alt" on a clash, so a repeated title can interleave with the
+    # first section (foo(1), foo(1)_alt, foo(2)) and the names alone are ambiguous. Within a
+    # section name, pages follow the order they were written; equal mtimes (e.g. a copy that
+    # reset them) fall back to page number then "_alt" depth. Bundles keep the exact order.
+    base, page, alt = split_page_name(os.path.splitext(filename)[0])
+    return base, mtime, page, len(alt)
+
+def section_title(name):
+    # Every page of a section shares the title it is ranked by
+    return normalize(split_page_name(name)[0])
+
+class ManualShard:
+    # Page names and titles stay resident; page text is loaded on demand
+    def __init__(self, manual, names, source, bundle_path=None):
+        self.manual = manual
+        self.source = source  # Loose folder, or the bundle file when bundle_path is set
+        self.bundle_path = bundle_path
+        self.names = names
+        self.page_titles = [name.replace("_", " ").upper() for name in names]
+        self.norm_titles = [section_title(name) for name in names]
+        self.image_paths = [os.path.join("images", manual, f"{name}.png") for name in names]
+        self.bundle = None
+        self.texts = None
+        self.size = 0
+
+    def titles(self):
+        return list(dict.fromkeys(self.page_titles))
+
+    def match(self, query_clean):
+        scores = {}
+        matches = []
+        for i, norm_title in enumerate(self.norm_titles):
+            if norm_title not in scores:
+                scores[norm_title] = difflib.SequenceMatcher(None, query_clean, norm_title).ratio()
+            score = scores[norm_title]
+            if query_clean in norm_title or score > MATCH_THRESHOLD:
+                matches.append((score, i))
+        return matches
+
+    def load(self):
+        if self.bundle_path:
+            bundle = ManualBundle(self.bundle_path)
+            try:
+                self.texts = [bundle.text(name).strip() for name in self.names]
+            except Exception:
+                bundle.close()
+                raise
+            self.bundle = bundle
+        else:
+            self.texts = []
+            for name in self.names:
+                content = ""
+                text_path = os.path.join(self.source, f"{name}.txt")
+                if os.path.exists(text_path):
+                    with open(text_path, "r", encoding="utf-8") as f:
+                        content = f.read().strip()
+                self.texts.append(content)
+        self.size = sum(len(t.encode("utf-8")) for t in self.texts)
+
+    def unload(self):
+        if self.bundle is not None:
+            self.bundle.close()
+        self.bundle = None
+        self.texts = None
+        self.size = 0
+
+def load_shard_from_folder(images_dir, manual):
+    folder = os.path.join(images_dir, manual)
+    pngs = [filename for filename in os.listdir(folder) if filename.endswith(".png")]
+    pngs.sort(key=lambda f: page_sort_key(f, os.stat(os.path.join(folder, f)).st_mtime_ns))
+    names = [filename[:-4] for filename in pngs]
+    return ManualShard(manual, names, folder)
+
+def load_shard_from_bundle(bundle_path, manual):
+    bundle = ManualBundle(bundle_path)
+    names = list(bundle.names)
+    bundle.close()
+    return ManualShard(manual, names, bundle_path, bundle_path)
+
+class ShardedHelpIndex:
+    def __init__(self, images_dir, budget=SHARD_BUDGET_BYTES):
+        self.images_dir = images_dir
+        self.budget = budget
+        self.shards = {}  # manual -> ManualShard, titles kept for the whole session
+        self.loaded = OrderedDict()  # manual -> ManualShard with page text in memory, least recently used first
+        self.loaded_bytes = 0
+        self.failed_bundles = {}  # bundle path -> mtime of a copy that failed to load, reported once
+
+    def manuals(self):
+        if not os.path.isdir(self.images_dir):
+            return []
+        names = set()
+        for d in os.listdir(self.images_dir):
+            if d.endswith(BUNDLE_EXT):
+                names.add(d[:-len(BUNDLE_EXT)])
+            elif os.path.isdir(os.path.join(self.images_dir, d)):
+                names.add(d)
+        return sorted(names)
+
+    def has_manual(self, manual):
+        return (
+            manual in self.shards
+            or os.path.exists(bundle_path_for(self.images_dir, manual))
+            or os.path.isdir(os.path.join(self.images_dir, manual))
+        )
+
+    def get_shard(self, manual):
+        shard = self.shards.get(manual)
+        if shard is not None:
+            return shard
+
+        # Packed bundle first, loose files as fallback; a damaged manual is skipped, not fatal
+        bundle_path = bundle_path_for(self.images_dir, manual)
+        folder = os.path.join(self.images_dir, manual)
+        if os.path.exists(bundle_path):
+            try:
+                mtime = os.stat(bundle_path).st_mtime_ns
+            except OSError:
+                mtime = None
+            # Retry only once the file has been replaced
+            if mtime is None or self.failed_bundles.get(bundle_path) != mtime:
+                try:
+                    shard = load_shard_from_bundle(bundle_path, manual)
+                    self.failed_bundles.pop(bundle_path, None)
+                except (OSError, ValueError) as e:
+                    print(f"❌ Failed to read bundle {bundle_path}: {e}")
+                    self.failed_bundles[bundle_path] = mtime
+        if shard is None and os.path.isdir(folder):
+            try:
+                shard = load_shard_from_folder(self.images_dir, manual)
+            except OSError as e:
+                print(f"❌ Failed to read manual folder {folder}: {e}")
+        if shard is not None:
+            self.shards[manual] = shard
+        return shard
+
+    def load_pages(self, shard):
+        if shard.manual in self.loaded:
+            self.loaded.move_to_end(shard.manual)
+            return shard
+
+        try:
+            shard.load()
+        except (OSError, ValueError) as e:
+            print(f"❌ Failed to load pages for {shard.manual}: {e}")
+            shard.unload()
+            return None
+        self.loaded[shard.manual] = shard
+        self.loaded_bytes += shard.size
+        return shard
+
+    def evict(self, keep=()):
+        for manual in list(self.loaded):
+            if self.loaded_bytes <= self.budget:
+                break
+            if manual in keep:
+                continue
+            shard = self.loaded.pop(manual)
+            self.loaded_bytes -= shard.size
+            shard.unload()
+
+    def image_data(self, manual, image_path):
+        # Mapped image bytes for bundled manuals, None when the manual uses loose files
+        shard = self.get_shard(manual)
+        if shard is not None:
+            shard = self.load_pages(shard)
+        self.evict(keep={manual})
+        if shard is None or shard.bundle is None:
+            return None
+        name = os.path.splitext(os.path.basename(image_path))[0]
+        return shard.bundle.image(name)
+
+    def search(self, query, manual=None):
+        query_clean = normalize(query)
+        manuals = [manual] if manual else self.manuals()
+
+        results = []
+        matched = set()
+        for name in manuals:
+            if not self.has_manual(name):
+                continue
+            shard = self.get_shard(name)
+            if shard is None:
+                continue
+            matches = shard.match(query_clean)
+            # Page text is only needed for manuals that actually matched
+            if not matches or self.load_pages(shard) is None:
+                continue
+            matched.add(name)
+            for score, i in matches:
+                results.append((score, name, shard.page_titles[i], shard.texts[i], shard.image_paths[i]))
+        # Trim the text cache only after the pass, never in the middle of it
+        self.evict(keep=matched)
+
+        # Best section first; the sort is stable, so pages of a section keep their order
+        results.sort(key=lambda r: -r[0])
+        return [(m, title, desc, image) for _, m, title, desc, image in results]
@@ -0,0 +1,102 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from src.bundle import ALIGN, PREFIX, BundleError, ManualBundle, write_bundle
+
+PAGES = [
+    ("stock_transfer(1)", b"\x89PNG\r\n\x1a\nfirst", "[GUIDELINE] Stock transfer\n\nSTOCK TRANSFER"),
+    ("stock_transfer(2)", b"", ""),
+    ("payroll(1)", b"\x89PNG\r\n\x1a\nsecond page", "Año • Paso ✅ 給与"),
+]
+
+class BundleTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "manual.bundle")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def write_raw(self, data):
+        with open(self.path, "wb") as f:
+            f.write(data)
+
+    def test_round_trip(self):
+        write_bundle(self.path, PAGES)
+        bundle = ManualBundle(self.path)
+        try:
+            self.assertEqual(bundle.names, [name for name, _, _ in PAGES])
+            for name, image, text in PAGES:
+                self.assertEqual(bytes(bundle.image(name)), image)
+                self.assertEqual(bundle.text(name), text)
+            self.assertIsNone(bundle.image("missing(1)"))
+            self.assertEqual(bundle.text("missing(1)"), "")
+        finally:
+            bundle.close()
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+    def test_blobs_are_aligned(self):
+        write_bundle(self.path, PAGES)
+        bundle = ManualBundle(self.path)
+        try:
+            for entry in bundle.entries.values():
+                self.assertEqual(entry["image"][0] % ALIGN, 0)
+                self.assertEqual(entry["text"][0] % ALIGN, 0)
+        finally:
+            bundle.close()
+
+    def test_image_is_a_view_of_the_mapping(self):
+        write_bundle(self.path, PAGES)
+        bundle = ManualBundle(self.path)
+        image = bundle.image("payroll(1)")
+        self.assertIsInstance(image, memoryview)
+        self.assertIs(image.obj, bundle.mm)
+        image.release()
+        bundle.close()
+        self.assertIsNone(bundle.mm)
+
+    def test_empty_file(self):
+        self.write_raw(b"")
+        with self.assertRaises(BundleError):
+            ManualBundle(self.path)
+
+    def test_truncated_file(self):
+        write_bundle(self.path, PAGES)
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for size in (4, PREFIX.size + 4, len(data) - 1):
+            self.write_raw(data[:size])
+            with self.assertRaises(BundleError):
+                ManualBundle(self.path)
+
+    def test_blob_past_header(self):
+        write_bundle(self.path, PAGES)
+        with open(self.path, "rb") as f:
+            data = f.read()
+        magic, version, header_offset, header_len = PREFIX.unpack_from(data, 0)
+        header = json.loads(data[header_offset:].decode("utf-8"))
+        header["entries"][0]["image"][1] = header_offset
+        header_bytes = json.dumps(header).encode("utf-8")
+        self.write_raw(
+            PREFIX.pack(magic, version, header_offset, len(header_bytes))
+            + data[PREFIX.size:header_offset]
+            + header_bytes
+        )
+        with self.assertRaises(BundleError):
+            ManualBundle(self.path)
+
+    def test_damaged_header(self):
+        write_bundle(self.path, PAGES)
+        with open(self.path, "rb") as f:
+            data = bytearray(f.read())
+        header_offset = PREFIX.unpack_from(data, 0)[2]
+        data[header_offset] = ord("#")
+        self.write_raw(bytes(data))
+        with self.assertRaises(BundleError):
+            ManualBundle(self.path)
+
+if __name__ == "__main__":
+    unittest.main()
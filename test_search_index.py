@@ -0,0 +1,136 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from src.bundle import write_bundle
+from src.search_index import ShardedHelpIndex
+
+LOOSE_PAGES = [
+    ("stock_transfer(1)", "Open the transfer screen"),
+    ("stock_transfer(2)", "Pick the items"),
+    ("stock_transfer(10)", "Post the transfer"),
+    ("payroll(1)", "Run payroll"),
+]
+
+BUNDLE_PAGES = [
+    ("stock_transfer(1)", b"\x89PNG\r\n\x1a\nretail", "Transferencia de stock ✅"),
+    ("adjustment_type(1)", b"", "Adjustment types"),
+]
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.add_loose_manual("PosWeb", LOOSE_PAGES)
+        write_bundle(os.path.join(self.tmp, "Retail.bundle"), BUNDLE_PAGES)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def add_loose_manual(self, manual, pages):
+        folder = os.path.join(self.tmp, manual)
+        os.makedirs(folder)
+        # Distinct, increasing mtimes in the order the importer would write the pages
+        for n, (name, text) in enumerate(pages):
+            for ext, data in ((".png", b"png"), (".txt", text.encode("utf-8"))):
+                path = os.path.join(folder, name + ext)
+                with open(path, "wb") as f:
+                    f.write(data)
+                os.utime(path, ns=(n * 10**9, n * 10**9))
+
+    def write_junk(self, name):
+        with open(os.path.join(self.tmp, name), "wb") as f:
+            f.write(b"junk")
+
+    def test_results_merge_manuals_in_page_order(self):
+        index = ShardedHelpIndex(self.tmp)
+        results = index.search("stock transfer")
+        self.assertEqual(
+            [(manual, title) for manual, title, _, _ in results],
+            [
+                ("PosWeb", "STOCK TRANSFER(1)"),
+                ("PosWeb", "STOCK TRANSFER(2)"),
+                ("PosWeb", "STOCK TRANSFER(10)"),
+                ("Retail", "STOCK TRANSFER(1)"),
+            ],
+        )
+        self.assertEqual(results[2][2], "Post the transfer")
+        self.assertEqual(results[3][2], "Transferencia de stock ✅")
+        self.assertEqual(results[3][3], os.path.join("images", "Retail", "stock_transfer(1).png"))
+
+    def test_better_section_ranks_first(self):
+        index = ShardedHelpIndex(self.tmp)
+        results = index.search("adjustment type")
+        self.assertEqual(results[0][:2], ("Retail", "ADJUSTMENT TYPE(1)"))
+
+    def test_filter_by_manual(self):
+        index = ShardedHelpIndex(self.tmp)
+        results = index.search("stock transfer", "Retail")
+        self.assertEqual([(m, t) for m, t, _, _ in results], [("Retail", "STOCK TRANSFER(1)")])
+        self.assertEqual(index.search("payroll", "Retail"), [])
+        self.assertEqual(index.search("payroll", "Missing"), [])
+
+    def test_alt_pages_follow_write_order(self):
+        self.add_loose_manual("Repeat", [
+            ("foo(1)", "first section"),
+            ("foo(1)_alt", "second section, page 1"),
+            ("foo(2)", "second section, page 2"),
+            ("foo(3)", "second section, page 3"),
+        ])
+        index = ShardedHelpIndex(self.tmp)
+        self.assertEqual(index.get_shard("Repeat").names, ["foo(1)", "foo(1)_alt", "foo(2)", "foo(3)"])
+
+    def test_eviction_runs_after_the_pass_and_keeps_matched(self):
+        index = ShardedHelpIndex(self.tmp, budget=1)
+        index.search("stock transfer")
+        # Both manuals matched, so both keep their text even over budget
+        self.assertEqual(set(index.loaded), {"PosWeb", "Retail"})
+
+        retail = index.get_shard("Retail")
+        self.assertIsNotNone(retail.bundle)
+        index.search("payroll")
+        self.assertEqual(list(index.loaded), ["PosWeb"])
+        self.assertIsNone(retail.bundle)
+        self.assertIsNone(retail.texts)
+        # Titles stay resident after eviction
+        self.assertIn("ADJUSTMENT TYPE(1)", retail.titles())
+
+    def test_budget_counts_utf8_bytes(self):
+        index = ShardedHelpIndex(self.tmp)
+        index.search("stock transfer", "Retail")
+        expected = sum(len(text.encode("utf-8")) for _, _, text in BUNDLE_PAGES)
+        self.assertEqual(index.loaded_bytes, expected)
+
+    def test_image_data(self):
+        index = ShardedHelpIndex(self.tmp)
+        image = index.image_data("Retail", os.path.join("images", "Retail", "stock_transfer(1).png"))
+        self.assertEqual(bytes(image), BUNDLE_PAGES[0][1])
+        image.release()
+        self.assertIsNone(index.image_data("PosWeb", os.path.join("images", "PosWeb", "payroll(1).png")))
+
+    def test_damaged_bundle_is_skipped(self):
+        self.write_junk("Broken.bundle")
+        index = ShardedHelpIndex(self.tmp)
+        out = io.StringIO()
+        with redirect_stdout(out):
+            results = index.search("stock transfer")
+            index.search("stock transfer")
+        self.assertEqual({m for m, _, _, _ in results}, {"PosWeb", "Retail"})
+        self.assertIsNone(index.get_shard("Broken"))
+        # Reported once, not on every query
+        self.assertEqual(out.getvalue().count("Broken.bundle:"), 1)
+
+    def test_damaged_bundle_falls_back_to_loose_folder(self):
+        self.add_loose_manual("Fallback", [("payroll(1)", "Loose payroll")])
+        self.write_junk("Fallback.bundle")
+        index = ShardedHelpIndex(self.tmp)
+        with redirect_stdout(io.StringIO()):
+            results = index.search("payroll", "Fallback")
+        self.assertEqual(results, [
+            ("Fallback", "PAYROLL(1)", "Loose payroll", os.path.join("images", "Fallback", "payroll(1).png")),
+        ])
+
+if __name__ == "__main__":
+    unittest.main()